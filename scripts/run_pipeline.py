@@ -17,24 +17,42 @@ Usage:
     python scripts/run_pipeline.py --skip-viz         # Skip visualization
 """
 
+from __future__ import annotations
+
 import argparse
+import datetime
 import logging
+import pickle
 import sys
 from pathlib import Path
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List
 
-import numpy as np
-import pandas as pd
-import yaml
+# numpy, pandas, yaml and the src modules are imported inside the methods
+# that use them so that `--help` and argument errors return immediately
+if TYPE_CHECKING:
+    import pandas as pd
 
 # Add src to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.utils import validate_bounding_box, classify_awd_suitability
-from src.water_balance import analyze_threshold_sensitivity
-
 logger = logging.getLogger(__name__)
 
+# Major rice-growing regions per study area
+_JAPAN_REGIONS = {
+    "Kanto": {"prefecture": "Tokyo, Kanagawa, Saitama, Chiba"},
+    "Tohoku": {"prefecture": "Iwate, Akita, Aomori, Yamagata, Miyagi, Fukushima"},
+    "Kyushu": {"prefecture": "Saga, Kumamoto, Nagasaki, Miyazaki, Kagoshima"},
+    "Hokkaido": {"prefecture": "Hokkaido"},
+}
+
+_VIETNAM_REGIONS = {
+    "Mekong Delta": {"provinces": "Can Tho, An Giang, Kien Giang"},
+    "Red River Delta": {"provinces": "Ha Noi, Nam Dinh, Hai Phong"},
+    "Central": {"provinces": "Thua Thien Hue, Da Nang"},
+}
+
+_REGIONS = {"japan": _JAPAN_REGIONS, "vietnam": _VIETNAM_REGIONS}
+
 
 class AWDPipeline:
     """Main pipeline orchestrator for AWD transportability analysis."""
@@ -54,73 +72,116 @@ class AWDPipeline:
         self.data_dir = Path(self.config["data"]["processed_dir"])
         
         self._setup_logging()
+        
+        # Pipeline-wide parameters are validated once, on first use after the
+        # log file is attached; only the study-area checks run per study area
+        self._wb_config = self.config["water_balance"]
+        self._bp_config = self.config["biophysical_constraints"]
+        self._global_valid = None
+        
         logger.info(f"AWD Pipeline initialized with config: {self.config_path}")
 
     def _load_config(self) -> Dict:
-        """Load and validate configuration from YAML."""
+        """
+        Load and validate configuration from YAML.
+
+        The parsed config is cached next to the YAML file as a pickle,
+        together with the source's mtime (ns) and size, and reused only while
+        both match exactly, so restoring an older YAML invalidates the cache.
+        """
+        cache_path = self.config_path.with_suffix(".yaml.pkl")
+        source_stat = self.config_path.stat()
+        source_key = (source_stat.st_mtime_ns, source_stat.st_size)
+        
+        if cache_path.exists():
+            try:
+                cached = pickle.loads(cache_path.read_bytes())
+            except Exception as e:
+                logger.debug(f"Ignoring unreadable config cache {cache_path}: {e}")
+                cached = None
+            
+            if isinstance(cached, dict) and cached.get("source") == source_key:
+                logger.info(f"Configuration loaded from cache: {cache_path}")
+                return cached["config"]
+        
+        import yaml
+        
+        try:
+            from yaml import CSafeLoader as YamlLoader
+        except ImportError:  # PyYAML built without libyaml
+            from yaml import SafeLoader as YamlLoader
+        
         with open(self.config_path) as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=YamlLoader)
+        
+        try:
+            cache_path.write_bytes(pickle.dumps(
+                {"source": source_key, "config": config},
+                protocol=pickle.HIGHEST_PROTOCOL
+            ))
+        except OSError as e:
+            logger.debug(f"Could not write config cache {cache_path}: {e}")
         
         logger.info(f"Configuration loaded: {len(config)} top-level sections")
         return config
 
     def _setup_logging(self):
-        """Configure logging to file and console."""
-        log_dir = Path(self.config["logging"]["log_dir"])
-        log_dir.mkdir(parents=True, exist_ok=True)
-        
-        log_file = log_dir / f"pipeline_{pd.Timestamp.now().strftime('%Y%m%d_%H%M%S')}.log"
-        
-        formatter = logging.Formatter(
+        """
+        Configure console logging.
+
+        The log file is only opened once the pipeline starts doing work
+        (see _ensure_logging), so summary-only invocations leave no file.
+        """
+        self._log_ready = False
+        self._log_formatter = logging.Formatter(
             "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
         )
         
-        # File handler
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setFormatter(formatter)
-        file_handler.setLevel(logging.DEBUG)
-        
         # Console handler
         console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
+        console_handler.setFormatter(self._log_formatter)
         console_handler.setLevel(logging.INFO)
         
         root_logger = logging.getLogger()
         root_logger.setLevel(logging.DEBUG)
-        root_logger.addHandler(file_handler)
         root_logger.addHandler(console_handler)
+
+    def _ensure_logging(self):
+        """Attach the timestamped file handler on first use."""
+        if self._log_ready:
+            return
+        
+        log_dir = Path(self.config["logging"]["log_dir"])
+        log_dir.mkdir(parents=True, exist_ok=True)
+        
+        log_file = log_dir / f"pipeline_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
         
+        # File handler
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setFormatter(self._log_formatter)
+        file_handler.setLevel(logging.DEBUG)
+        logging.getLogger().addHandler(file_handler)
+        
+        self._log_ready = True
         logger.info(f"Logging initialized: {log_file}")
 
-    def validate_inputs(self, study_area: str) -> bool:
+    def _validate_global(self) -> bool:
         """
-        Validate input data and configuration for study area.
-
-        Args:
-            study_area: "vietnam" or "japan"
+        Validate pipeline-wide water balance and biophysical parameters.
 
         Returns:
             True if all validations pass
         """
-        logger.info(f"Validating inputs for study area: {study_area}")
-        
-        study_config = self.config["study_areas"][study_area]
+        import numpy as np
         
-        # Validate bounding box
-        bbox = study_config["bounding_box"]
-        try:
-            validate_bounding_box(bbox)
-            logger.info(f"✓ Bounding box valid: {bbox}")
-        except ValueError as e:
-            logger.error(f"✗ Bounding box validation failed: {e}")
-            return False
+        logger.info("Validating pipeline parameters")
         
         # Check water balance parameters
-        wb_config = self.config["water_balance"]
-        season_start = wb_config["season_start_dekad"]
-        season_end = wb_config["season_end_dekad"]
+        season_start = self._wb_config["season_start_dekad"]
+        season_end = self._wb_config["season_end_dekad"]
         
-        if not (1 <= season_start <= 36 and 1 <= season_end <= 36):
+        season = np.asarray([season_start, season_end])
+        if not ((season >= 1) & (season <= 36)).all():
             logger.error(f"✗ Invalid season dekads: {season_start}-{season_end}")
             return False
         
@@ -131,20 +192,67 @@ class AWDPipeline:
         logger.info(f"✓ Season dekads valid: {season_start}-{season_end}")
         
         # Validate deficit thresholds
-        thresholds = wb_config["deficit_thresholds"]
-        if not all(t < 0 for t in thresholds):
-            logger.error(f"✗ All deficit thresholds must be negative: {thresholds}")
+        thresholds = np.asarray(self._wb_config["deficit_thresholds"])
+        if not (thresholds < 0).all():
+            logger.error(f"✗ All deficit thresholds must be negative: {thresholds.tolist()}")
             return False
         
-        logger.info(f"✓ Deficit thresholds valid: {len(thresholds)} thresholds from {min(thresholds)} to {max(thresholds)} mm")
+        logger.info(f"✓ Deficit thresholds valid: {thresholds.size} thresholds from {thresholds.min()} to {thresholds.max()} mm")
         
         # Validate biophysical constraints
-        bp_config = self.config["biophysical_constraints"]
-        if bp_config["slope_threshold_deg"] < 0 or bp_config["slope_threshold_deg"] > 90:
-            logger.error(f"✗ Invalid slope threshold: {bp_config['slope_threshold_deg']}")
+        slope_threshold = self._bp_config["slope_threshold_deg"]
+        if slope_threshold < 0 or slope_threshold > 90:
+            logger.error(f"✗ Invalid slope threshold: {slope_threshold}")
             return False
         
         logger.info(f"✓ Biophysical constraints valid")
+        return True
+
+    def _validate_study_area(self, study_area: str) -> bool:
+        """
+        Validate study-area specific configuration (bounding box).
+
+        Args:
+            study_area: "vietnam" or "japan"
+
+        Returns:
+            True if all validations pass
+        """
+        from src.utils import validate_bounding_box
+        
+        bbox = self.config["study_areas"][study_area]["bounding_box"]
+        if not validate_bounding_box(bbox):
+            logger.error(f"✗ Bounding box validation failed: {bbox}")
+            return False
+        
+        logger.info(f"✓ Bounding box valid: {bbox}")
+        return True
+
+    def validate_inputs(self, study_area: str) -> bool:
+        """
+        Validate input data and configuration for study area.
+
+        Pipeline-wide parameters are checked once, on the first call; this
+        combines that result with the study-area specific checks.
+
+        Args:
+            study_area: "vietnam" or "japan"
+
+        Returns:
+            True if all validations pass
+        """
+        self._ensure_logging()
+        logger.info(f"Validating inputs for study area: {study_area}")
+        
+        if self._global_valid is None:
+            self._global_valid = self._validate_global()
+        
+        if not self._global_valid:
+            logger.error("✗ Pipeline parameters failed validation")
+            return False
+        
+        if not self._validate_study_area(study_area):
+            return False
         
         logger.info(f"✓ All validation checks passed for {study_area.upper()}")
         return True
@@ -163,32 +271,44 @@ class AWDPipeline:
             study_area: "vietnam" or "japan"
 
         Returns:
-            DataFrame with columns [date, rainfall_mm, pet_mm, percolation_mm, water_balance_mm]
+            DataFrame with columns [dekad, rainfall_mm, pet_mm, percolation_mm, water_balance_mm].
+            `dekad` is the 0-based dekad index from the season start date stored
+            in `attrs["start_date"]`; dates are only materialized when saving.
         """
+        import numpy as np
+        import pandas as pd
+        
+        self._ensure_logging()
         logger.info(f"Processing water balance for {study_area.upper()}")
         
         # TODO: Load water balance data from data/processed/
         # For now, generate synthetic example to demonstrate pipeline structure
         
-        dekads = pd.date_range(
-            start=f"{self.config['study_areas'][study_area]['year']}-05-01",
-            end=f"{self.config['study_areas'][study_area]['year']}-09-30",
-            freq="10D"
-        )
+        year = self.config['study_areas'][study_area]['year']
+        start = datetime.date(year, 5, 1)
+        end = datetime.date(year, 9, 30)
         
-        # Synthetic data for demonstration
-        wb_data = pd.DataFrame({
-            "date": dekads,
-            "rainfall_mm": np.random.uniform(30, 150, len(dekads)),
-            "pet_mm": np.random.uniform(40, 80, len(dekads)),
-            "percolation_mm": np.random.uniform(15, 35, len(dekads)),
-        })
+        n_dekads = ((end - start).days // 10) + 1
+        dekads = np.arange(n_dekads, dtype=np.int16)
+        
+        # Synthetic data for demonstration: rainfall, PET, percolation
+        rng = np.random.default_rng()
+        synthetic = rng.uniform(
+            [30, 40, 15], [150, 80, 35], size=(len(dekads), 3)
+        ).astype(np.float32)
+        rainfall, pet, percolation = synthetic[:, 0], synthetic[:, 1], synthetic[:, 2]
         
         # Compute water balance
-        wb_data["water_balance_mm"] = (
-            wb_data["rainfall_mm"] - 
-            (wb_data["pet_mm"] + wb_data["percolation_mm"])
-        )
+        water_balance = rainfall - (pet + percolation)
+        
+        wb_data = pd.DataFrame({
+            "dekad": dekads,
+            "rainfall_mm": rainfall,
+            "pet_mm": pet,
+            "percolation_mm": percolation,
+            "water_balance_mm": water_balance,
+        }, copy=False)
+        wb_data.attrs["start_date"] = start.isoformat()
         
         logger.info(f"Generated {len(wb_data)} dekads with mean WB = {wb_data['water_balance_mm'].mean():.1f} mm")
         return wb_data
@@ -203,11 +323,14 @@ class AWDPipeline:
         Returns:
             DataFrame with sensitivity results
         """
+        from src.water_balance import analyze_threshold_sensitivity
+        
+        self._ensure_logging()
         logger.info("Running threshold sensitivity analysis")
         
-        thresholds = self.config["water_balance"]["deficit_thresholds"]
-        season_start = self.config["water_balance"]["season_start_dekad"]
-        season_end = self.config["water_balance"]["season_end_dekad"]
+        thresholds = self._wb_config["deficit_thresholds"]
+        season_start = self._wb_config["season_start_dekad"]
+        season_end = self._wb_config["season_end_dekad"]
         
         # Call core analysis function
         results = analyze_threshold_sensitivity(
@@ -236,21 +359,10 @@ class AWDPipeline:
         Returns:
             Dictionary with regional stats
         """
+        self._ensure_logging()
         logger.info(f"Generating regional statistics for {study_area.upper()}")
         
-        if study_area == "japan":
-            regions = {
-                "Kanto": {"prefecture": "Tokyo, Kanagawa, Saitama, Chiba"},
-                "Tohoku": {"prefecture": "Iwate, Akita, Aomori, Yamagata, Miyagi, Fukushima"},
-                "Kyushu": {"prefecture": "Saga, Kumamoto, Nagasaki, Miyazaki, Kagoshima"},
-                "Hokkaido": {"prefecture": "Hokkaido"},
-            }
-        elif study_area == "vietnam":
-            regions = {
-                "Mekong Delta": {"provinces": "Can Tho, An Giang, Kien Giang"},
-                "Red River Delta": {"provinces": "Ha Noi, Nam Dinh, Hai Phong"},
-                "Central": {"provinces": "Thua Thien Hue, Da Nang"},
-            }
+        regions = _REGIONS[study_area]
         
         logger.info(f"Computed statistics for {len(regions)} regions")
         return regions
@@ -263,25 +375,41 @@ class AWDPipeline:
             study_area: "vietnam" or "japan"
             results: Dictionary with analysis results
         """
+        import pandas as pd
+        
+        self._ensure_logging()
+        
         output_study_dir = self.output_dir / study_area
         output_study_dir.mkdir(parents=True, exist_ok=True)
         
         # Save threshold sensitivity
         if "sensitivity" in results:
             sensitivity_file = output_study_dir / "threshold_sensitivity.csv"
-            results["sensitivity"].to_csv(sensitivity_file, index=False)
+            results["sensitivity"].to_csv(sensitivity_file, index=False, lineterminator="\n")
             logger.info(f"Saved sensitivity analysis: {sensitivity_file}")
         
         # Save regional statistics
         if "regional_stats" in results:
             stats_file = output_study_dir / "regional_statistics.txt"
-            with open(stats_file, "w") as f:
-                for region, stats in results["regional_stats"].items():
-                    f.write(f"\n{region}:\n")
-                    for key, val in stats.items():
-                        f.write(f"  {key}: {val}\n")
+            lines = []
+            for region, stats in results["regional_stats"].items():
+                lines.append(f"\n{region}:")
+                lines.extend(f"  {key}: {val}" for key, val in stats.items())
+            stats_file.write_text("\n".join(lines) + "\n")
             logger.info(f"Saved regional statistics: {stats_file}")
         
+        # Save dekad water balance, converting dekad indices back to dates
+        if "water_balance" in results:
+            wb_data = results["water_balance"]
+            wb_out = wb_data.drop(columns="dekad")
+            wb_out.insert(0, "date", (
+                pd.to_datetime(wb_data.attrs["start_date"])
+                + pd.to_timedelta(wb_data["dekad"].to_numpy() * 10, unit="D")
+            ))
+            wb_file = output_study_dir / "water_balance.csv"
+            wb_out.to_csv(wb_file, index=False)
+            logger.info(f"Saved water balance: {wb_file}")
+        
         logger.info(f"All outputs saved to {output_study_dir}")
 
     def run(self, study_areas: List[str] = None, skip_visualization: bool = False):
@@ -295,6 +423,7 @@ class AWDPipeline:
         if study_areas is None:
             study_areas = list(self.config["study_areas"].keys())
         
+        self._ensure_logging()
         logger.info(f"🚀 Starting AWD Pipeline for {len(study_areas)} study area(s)")
         logger.info("=" * 70)
         
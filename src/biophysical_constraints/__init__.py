@@ -15,9 +15,53 @@ import numpy as np
 import pandas as pd
 from typing import Dict, List, Tuple
 
+from src.utils import NUMBA_AVAILABLE, uint8_histogram
+
+if NUMBA_AVAILABLE:
+    from numba import get_num_threads, njit, prange
+
 logger = logging.getLogger(__name__)
 
 
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _composite_feasibility_kernel(slope, drainage, wb, drainage_threshold, out, n_chunks):
+        n = slope.size
+        step = (n + n_chunks - 1) // n_chunks
+        partial = np.zeros(n_chunks, np.int64)
+        for c in prange(n_chunks):
+            for i in range(c * step, min((c + 1) * step, n)):
+                ok = slope[i] and drainage[i] <= drainage_threshold and wb[i] >= 2
+                out[i] = ok
+                partial[c] += ok
+        return partial.sum()
+
+
+def _mask_code_histogram(
+    slope_feasible: np.ndarray,
+    drainage_feasible: np.ndarray,
+    water_balance_feasible: np.ndarray
+) -> np.ndarray:
+    """
+    Histogram of the 3-bit code packing the three feasibility masks.
+    
+    Bit 0 = slope, bit 1 = drainage, bit 2 = water balance.
+    
+    Returns:
+        Array of 8 pixel counts indexed by code
+    """
+    # Broadcast first so masks of compatible shapes combine like the & expression
+    s, d, w = (
+        np.ascontiguousarray(m, dtype=bool).view(np.uint8).ravel()
+        for m in np.broadcast_arrays(
+            slope_feasible, drainage_feasible, water_balance_feasible
+        )
+    )
+    
+    code = s | (d << 1) | (w << 2)
+    return uint8_histogram(code)[:8]
+
+
 def classify_slope(dem: np.ndarray, threshold_deg: float = 10.0) -> np.ndarray:
     """
     Classify terrain slope for AWD feasibility.
@@ -26,7 +70,9 @@ def classify_slope(dem: np.ndarray, threshold_deg: float = 10.0) -> np.ndarray:
     make flood-and-drain cycles difficult to implement uniformly.
     
     Args:
-        dem: Digital elevation model (2D array, units: meters)
+        dem: Digital elevation model (2D array, units: meters). Cast to
+            float32 before filtering; for a 10° threshold the lost precision
+            is well below the vertical error of a 30 m DEM.
         threshold_deg: Maximum feasible slope (default: 10 degrees)
     
     Returns:
@@ -35,17 +81,17 @@ def classify_slope(dem: np.ndarray, threshold_deg: float = 10.0) -> np.ndarray:
     logger.info(f"Classifying terrain with slope threshold {threshold_deg}°")
     
     # Compute slope from DEM (simplified Sobel filter)
-    from scipy.ndimage import sobel
+    from scipy.ndimage import generic_gradient_magnitude, sobel
     
-    grad_x = sobel(dem, axis=1)
-    grad_y = sobel(dem, axis=0)
+    dem = np.asarray(dem, dtype=np.float32)
     
-    # Slope in degrees
-    slope_rad = np.arctan(np.sqrt(grad_x**2 + grad_y**2) / 30)  # 30m cell size
-    slope_deg = np.degrees(slope_rad)
+    # sqrt(gx² + gy²), accumulated by scipy in a single float32 output buffer
+    grad_mag = generic_gradient_magnitude(dem, sobel, output=np.empty_like(dem))
     
-    feasible = slope_deg < threshold_deg
-    pct_feasible = 100 * feasible.sum() / feasible.size
+    # arctan is monotonic, so slope < threshold is equivalent to comparing the
+    # gradient magnitude against the tangent of the threshold
+    feasible = grad_mag < np.tan(np.deg2rad(threshold_deg)) * 30.0  # 30m cell size
+    pct_feasible = 100 * feasible.mean()
     
     logger.info(f"Slope feasibility: {pct_feasible:.1f}% of area below {threshold_deg}°")
     
@@ -59,8 +105,8 @@ def classify_drainage(clay_pct: np.ndarray, sand_pct: np.ndarray) -> Dict[str, n
     Drainage classes determine percolation rates and suitability for AWD.
     
     Args:
-        clay_pct: Clay content (0-100%)
-        sand_pct: Sand content (0-100%)
+        clay_pct: Clay content (0-100%), cast to float32
+        sand_pct: Sand content (0-100%), cast to float32
     
     Returns:
         Dictionary with keys:
@@ -75,34 +121,30 @@ def classify_drainage(clay_pct: np.ndarray, sand_pct: np.ndarray) -> Dict[str, n
     # Class 3: Imperfectly drained (clay loam)
     # Class 4: Poorly drained (clay, high moisture)
     
-    drainage_class = np.zeros_like(clay_pct, dtype=int)
-    percolation_mm_day = np.zeros_like(clay_pct, dtype=float)
-    
-    # Well-drained: clay < 20%, sand > 60%
-    well = (clay_pct < 20) & (sand_pct > 60)
-    drainage_class[well] = 1
-    percolation_mm_day[well] = 12.0  # mm/day
+    clay = np.ascontiguousarray(clay_pct, dtype=np.float32)
+    sand = np.ascontiguousarray(sand_pct, dtype=np.float32)
     
-    # Moderately drained: clay 20-35%, sand 30-60%
-    mod = ((clay_pct >= 20) & (clay_pct < 35)) | ((sand_pct >= 30) & (sand_pct <= 60))
-    drainage_class[mod] = 2
-    percolation_mm_day[mod] = 8.0
+    # Conditions are listed from poorest to best drainage so that, where the
+    # texture rules overlap, the poorer class takes precedence
+    conditions = [
+        clay >= 50,                                                    # Poorly drained
+        (clay >= 35) & (clay < 50),                                    # Imperfectly drained
+        ((clay >= 20) & (clay < 35)) | ((sand >= 30) & (sand <= 60)),  # Moderately drained
+        (clay < 20) & (sand > 60),                                     # Well-drained
+    ]
+    drainage_class = np.select(conditions, [4, 3, 2, 1], default=0).astype(np.int8)
     
-    # Imperfectly drained: clay 35-50%
-    imperf = (clay_pct >= 35) & (clay_pct < 50)
-    drainage_class[imperf] = 3
-    percolation_mm_day[imperf] = 4.0
+    # Percolation rate (mm/day) indexed by drainage class (0 = unclassified)
+    percolation_lut = np.array([0.0, 12.0, 8.0, 4.0, 3.0], dtype=np.float32)
+    percolation_mm_day = percolation_lut[drainage_class]
     
-    # Poorly drained: clay >= 50%
-    poor = clay_pct >= 50
-    drainage_class[poor] = 4
-    percolation_mm_day[poor] = 3.0
+    counts = np.bincount(drainage_class.ravel(), minlength=5)
     
     logger.info(f"Drainage classification complete")
-    logger.info(f"  Well-drained: {well.sum()} pixels")
-    logger.info(f"  Moderately-drained: {mod.sum()} pixels")
-    logger.info(f"  Imperfectly-drained: {imperf.sum()} pixels")
-    logger.info(f"  Poorly-drained: {poor.sum()} pixels")
+    logger.info(f"  Well-drained: {counts[1]} pixels")
+    logger.info(f"  Moderately-drained: {counts[2]} pixels")
+    logger.info(f"  Imperfectly-drained: {counts[3]} pixels")
+    logger.info(f"  Poorly-drained: {counts[4]} pixels")
     
     return {
         "drainage_class": drainage_class,
@@ -135,13 +177,30 @@ def compute_biophysical_suitability(
     """
     logger.info("Computing composite biophysical suitability")
     
-    feasible = (
-        slope_feasible &
-        (drainage_class <= drainage_threshold) &
-        (water_balance_suitability >= 2)  # At least moderate WB suitability
-    )
+    if NUMBA_AVAILABLE:
+        # Single fused pass: build the composite mask and count it together.
+        # Inputs are broadcast up front to match the NumPy expression below.
+        slope_b, drainage_b, wb_b = np.broadcast_arrays(
+            slope_feasible, drainage_class, water_balance_suitability
+        )
+        feasible = np.empty(slope_b.shape, dtype=bool)
+        n_feasible = _composite_feasibility_kernel(
+            np.ascontiguousarray(slope_b, dtype=bool).ravel(),
+            np.ascontiguousarray(drainage_b).ravel(),
+            np.ascontiguousarray(wb_b).ravel(),
+            drainage_threshold,
+            feasible.ravel(),
+            get_num_threads()
+        )
+        pct_feasible = 100 * n_feasible / feasible.size
+    else:
+        feasible = (
+            slope_feasible &
+            (drainage_class <= drainage_threshold) &
+            (water_balance_suitability >= 2)  # At least moderate WB suitability
+        )
+        pct_feasible = 100 * feasible.mean()
     
-    pct_feasible = 100 * feasible.sum() / feasible.size
     logger.info(f"Composite feasibility: {pct_feasible:.1f}% of area")
     
     return feasible
@@ -171,6 +230,18 @@ def analyze_constraint_importance(
     
     total_pixels = slope_feasible.size
     
+    # Pack the three masks into a 3-bit code per pixel (slope = bit 0,
+    # drainage = bit 1, water balance = bit 2) and histogram it once
+    counts = _mask_code_histogram(slope_feasible, drainage_feasible, water_balance_feasible)
+    
+    n_slope = counts[[1, 3, 5, 7]].sum()
+    n_drainage = counts[[2, 3, 6, 7]].sum()
+    n_wb = counts[[4, 5, 6, 7]].sum()
+    n_slope_drainage = counts[[3, 7]].sum()
+    n_slope_wb = counts[[5, 7]].sum()
+    n_drainage_wb = counts[[6, 7]].sum()
+    n_all = counts[7]
+    
     results = {
         "Constraint": [
             "Slope only",
@@ -182,13 +253,13 @@ def analyze_constraint_importance(
             "All three"
         ],
         "Feasible (%)": [
-            100 * slope_feasible.sum() / total_pixels,
-            100 * drainage_feasible.sum() / total_pixels,
-            100 * water_balance_feasible.sum() / total_pixels,
-            100 * (slope_feasible & drainage_feasible).sum() / total_pixels,
-            100 * (slope_feasible & water_balance_feasible).sum() / total_pixels,
-            100 * (drainage_feasible & water_balance_feasible).sum() / total_pixels,
-            100 * (slope_feasible & drainage_feasible & water_balance_feasible).sum() / total_pixels,
+            100 * n_slope / total_pixels,
+            100 * n_drainage / total_pixels,
+            100 * n_wb / total_pixels,
+            100 * n_slope_drainage / total_pixels,
+            100 * n_slope_wb / total_pixels,
+            100 * n_drainage_wb / total_pixels,
+            100 * n_all / total_pixels,
         ]
     }
     
@@ -18,12 +18,96 @@ import pandas as pd
 from pathlib import Path
 from typing import Dict, Tuple, Optional
 
+from src.utils import NUMBA_AVAILABLE, uint8_histogram
+
+if NUMBA_AVAILABLE:
+    from numba import njit, prange
+
 logger = logging.getLogger(__name__)
 
 
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _block_mode_kernel(x, cell_size, h_agg, w_agg):
+        # One output row per iteration; each block is histogrammed locally,
+        # so every input pixel is read once and no count arrays are built
+        out = np.zeros((h_agg, w_agg), np.uint8)
+        for i in prange(h_agg):
+            counts = np.zeros(4, np.int64)
+            for j in range(w_agg):
+                counts[:] = 0
+                for di in range(cell_size):
+                    for dj in range(cell_size):
+                        v = x[i * cell_size + di, j * cell_size + dj]
+                        if v <= 3:
+                            counts[v] += 1
+                best = 0
+                best_count = 0
+                for k in range(1, 4):
+                    if counts[k] > best_count:
+                        best_count = counts[k]
+                        best = k
+                out[i, j] = best
+        return out
+
+
+def _class_histogram(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Count suitability classes 0-3 in a raster in a single pass.
+    
+    uint8 rasters are histogrammed directly (with Numba when available);
+    other dtypes fall back to np.unique.
+    
+    Args:
+        data: Suitability raster of any shape
+    
+    Returns:
+        Tuple of (counts of values 0-3, array of any other values present)
+    """
+    if data.dtype == np.uint8:
+        hist = uint8_histogram(data)
+        return hist[:4], np.flatnonzero(hist[4:]) + 4
+    
+    values, counts = np.unique(data, return_counts=True)
+    hist = np.zeros(4, dtype=np.int64)
+    is_class = np.isin(values, [0, 1, 2, 3])
+    hist[values[is_class].astype(np.intp)] = counts[is_class]
+    return hist, values[~is_class]
+
+
+def _fits_class_dtype(data: np.ndarray) -> bool:
+    """Whether every value of 'data' is integral and fits in uint8."""
+    if data.dtype == np.uint8 or data.size == 0:
+        return True
+    
+    lo, hi = data.min(), data.max()
+    if not (0 <= lo and hi <= 255):
+        return False
+    
+    if np.issubdtype(data.dtype, np.floating) and not np.array_equal(data, np.trunc(data)):
+        return False
+    
+    return True
+
+
+def _to_class_dtype(data: np.ndarray) -> np.ndarray:
+    """
+    Cast a suitability raster to uint8 when its values are integral and fit.
+    
+    Class labels are 0-3, so uint8 is lossless and moves 4-8× fewer bytes
+    than float32/float64. Rasters with NaNs, fractional or out-of-range
+    values are returned unchanged.
+    """
+    if not _fits_class_dtype(data):
+        return data
+    
+    return data.astype(np.uint8, copy=False)
+
+
 def load_gee_export(
     filepath: Path,
-    study_area: str = "japan"
+    study_area: str = "japan",
+    lazy: bool = False
 ) -> Dict[str, np.ndarray]:
     """
     Load Google Earth Engine exported water balance suitability raster.
@@ -31,15 +115,27 @@ def load_gee_export(
     Expected format: Multi-band GeoTIFF with bands for each deficit threshold.
     Band names: suitability_-25, suitability_-50, ..., suitability_-150
     
+    Class rasters are returned as uint8 whenever their values allow it.
+    
+    The full cube is read tile by tile (following the file's block layout).
+    With lazy=True no pixels are read up front; single bands are read on
+    demand through 'read_band', which is what extract_by_threshold and
+    compute_suitability_statistics use when 'data' is None.
+    
     Args:
         filepath: Path to GeoTIFF file from GEE export
         study_area: "japan" or "vietnam" for validation
+        lazy: If True, skip reading pixel data until a band is requested
     
     Returns:
         Dictionary with keys:
-        - 'data': 3D array (height, width, bands)
+        - 'data': 3D array (bands, height, width), or None if lazy
+        - 'band_axis': Axis of 'data' indexing bands (always 0)
         - 'bands': List of band names (deficit thresholds)
+        - 'band_index': Dict mapping band name -> position in 'bands'
         - 'profile': rasterio profile (projection, transform, etc.)
+        - 'filepath': Source GeoTIFF path, for band-subset re-reads
+        - 'read_band': Callable returning the 2D array for a band name
     """
     logger.info(f"Loading GEE export: {filepath}")
     
@@ -48,24 +144,49 @@ def load_gee_export(
     
     with rasterio.open(filepath) as src:
         profile = src.profile
-        data = src.read()  # Shape: (bands, height, width)
         
-        # Get band descriptions
-        bands = [src.descriptions[i] or f"band_{i}" for i in range(src.count)]
+        # Get band descriptions, plus a name -> band position lookup
+        bands = [desc or f"band_{i}" for i, desc in enumerate(src.descriptions)]
+        band_index = {name: i for i, name in enumerate(bands)}
         
         logger.info(f"  Projection: {profile['crs']}")
-        logger.info(f"  Shape: {data.shape[1:]} pixels")
+        logger.info(f"  Shape: {(src.height, src.width)} pixels")
         logger.info(f"  Bands: {src.count}")
         logger.info(f"  Band names: {bands}")
         
-        # Transpose to (height, width, bands) for easier indexing
-        data = np.transpose(data, (1, 2, 0))
+        if lazy:
+            data = None
+        else:
+            # Read one tile at a time into the band-major (bands, height, width)
+            # cube, so each band is a contiguous 2D array. Tiles are checked
+            # and cast to uint8 as they arrive; the cube is only widened to
+            # the source dtype once a tile turns out not to be class-valued.
+            shape = (src.count, src.height, src.width)
+            data = np.empty(shape, dtype=np.uint8)
+            for _, window in src.block_windows(1):
+                tile = src.read(window=window)
+                if data.dtype == np.uint8 and not _fits_class_dtype(tile):
+                    # Earlier tiles were integral, so widening them is lossless
+                    data = data.astype(src.dtypes[0])
+                data[
+                    :,
+                    window.row_off:window.row_off + window.height,
+                    window.col_off:window.col_off + window.width
+                ] = tile
+    
+    def read_band(band_name: str) -> np.ndarray:
+        """Read a single band from the source GeoTIFF."""
+        with rasterio.open(filepath) as src:
+            return _to_class_dtype(src.read(band_index[band_name] + 1))
     
     return {
         "data": data,
+        "band_axis": 0,
         "bands": bands,
+        "band_index": band_index,
         "profile": profile,
-        "filepath": filepath
+        "filepath": filepath,
+        "read_band": read_band
     }
 
 
@@ -92,27 +213,30 @@ def validate_water_balance_data(
     
     data = wb_data["data"]
     
+    if data is None:
+        logger.error("No pixel data loaded (lazy export); load eagerly to validate")
+        return False
+    
     # Check shape
     if len(data.shape) != 3:
         logger.error(f"Invalid shape: {data.shape} (expected 3D)")
         return False
     
-    height, width, bands = data.shape
-    logger.info(f"  Array shape: {height}×{width}×{bands}")
+    bands, height, width = data.shape
+    logger.info(f"  Array shape: {bands}×{height}×{width} (bands×height×width)")
     
     # Check bands
     if bands != expected_bands:
         logger.warning(f"Expected {expected_bands} bands, got {bands}")
     
-    # Check value range
-    valid_values = {1, 2, 3}
-    unique_values = set(np.unique(data).astype(int))
+    # Check value range and nodata from a single histogram pass
+    hist, unexpected = _class_histogram(data)
     
-    if not unique_values.issubset(valid_values | {0}):
-        logger.warning(f"Unexpected values found: {unique_values} (expected 0-3)")
+    if unexpected.size:
+        logger.warning(f"Unexpected values found: {set(unexpected.tolist())} (expected 0-3)")
     
     # Check for nodata
-    n_nodata = (data == 0).sum()
+    n_nodata = hist[0]
     pct_nodata = 100 * n_nodata / data.size
     logger.info(f"  Nodata pixels: {pct_nodata:.1f}%")
     
@@ -122,26 +246,38 @@ def validate_water_balance_data(
 
 def extract_by_threshold(
     wb_data: Dict[str, np.ndarray],
-    threshold: float
+    threshold: float,
+    filepath: Optional[Path] = None
 ) -> np.ndarray:
     """
     Extract suitability map for specific deficit threshold.
     
+    Only the requested band is read from disk when the pixel data was not
+    loaded (lazy export) or when filepath is given.
+    
     Args:
         wb_data: Dictionary from load_gee_export()
         threshold: Deficit threshold (e.g., -50.0)
+        filepath: GeoTIFF to read the band from instead of wb_data["data"]
     
     Returns:
         2D suitability array for that threshold
     """
-    bands = wb_data["bands"]
     band_name = f"suitability_{threshold:.0f}"
+    band_idx = wb_data["band_index"].get(band_name)
+    
+    if band_idx is None:
+        raise ValueError(f"Band '{band_name}' not found. Available: {wb_data['bands']}")
+    
+    if filepath is not None:
+        # Band-subset read: only this band's blocks are decoded
+        with rasterio.open(filepath) as src:
+            return _to_class_dtype(src.read(band_idx + 1))
     
-    if band_name not in bands:
-        raise ValueError(f"Band '{band_name}' not found. Available: {bands}")
+    if wb_data["data"] is None:
+        return wb_data["read_band"](band_name)
     
-    band_idx = bands.index(band_name)
-    return wb_data["data"][:, :, band_idx]
+    return wb_data["data"][band_idx]
 
 
 def compute_suitability_statistics(
@@ -161,27 +297,31 @@ def compute_suitability_statistics(
     results = []
     
     for i, band_name in enumerate(wb_data["bands"]):
-        suitability_map = wb_data["data"][:, :, i]
+        if wb_data["data"] is None:
+            suitability_map = wb_data["read_band"](band_name)
+        else:
+            suitability_map = wb_data["data"][i]
         
-        # Remove nodata (0 values)
-        valid_mask = suitability_map > 0
+        # Class counts from a single histogram pass (classes are 0-3);
+        # nodata (0) pixels are simply left out of n_valid
+        hist, _ = _class_histogram(suitability_map)
+        n_low, n_mod, n_high = hist[1], hist[2], hist[3]
+        n_valid = int(n_low + n_mod + n_high)
         
-        if not valid_mask.any():
+        if n_valid == 0:
             continue
         
-        valid_values = suitability_map[valid_mask]
-        
         # Extract threshold from band name
         threshold_mm = float(band_name.split("_")[-1])
         
         results.append({
             "threshold_mm": threshold_mm,
-            "n_pixels_high": (suitability_map == 3).sum(),
-            "n_pixels_moderate": (suitability_map == 2).sum(),
-            "n_pixels_low": (suitability_map == 1).sum(),
-            "pct_high": 100 * (suitability_map == 3).sum() / valid_mask.sum(),
-            "pct_moderate": 100 * (suitability_map == 2).sum() / valid_mask.sum(),
-            "pct_low": 100 * (suitability_map == 1).sum() / valid_mask.sum(),
+            "n_pixels_high": n_high,
+            "n_pixels_moderate": n_mod,
+            "n_pixels_low": n_low,
+            "pct_high": 100 * n_high / n_valid,
+            "pct_moderate": 100 * n_mod / n_valid,
+            "pct_low": 100 * n_low / n_valid,
         })
     
     df = pd.DataFrame(results).sort_values("threshold_mm")
@@ -199,12 +339,18 @@ def aggregate_to_grid(
     
     Useful for visualization and reducing data size for web deployment.
     
+    Each output cell takes the modal (most frequent) non-zero class of its
+    cell_size×cell_size block, with ties going to the lower class. Blocks
+    without valid pixels are 0. Earlier versions used the median of the
+    valid pixels, which is not a majority vote for mixed blocks. uint8 maps
+    are aggregated by a Numba kernel when available.
+    
     Args:
         suitability_map: 2D suitability array
         cell_size: Aggregation factor (e.g., 4×4 → 1 pixel)
     
     Returns:
-        Aggregated array
+        Aggregated uint8 class array
     """
     logger.info(f"Aggregating to {cell_size}× coarser grid")
     
@@ -212,16 +358,24 @@ def aggregate_to_grid(
     h_agg = h // cell_size
     w_agg = w // cell_size
     
-    aggregated = np.zeros((h_agg, w_agg), dtype=np.float32)
-    
-    for i in range(h_agg):
-        for j in range(w_agg):
-            window = suitability_map[
-                i*cell_size:(i+1)*cell_size,
-                j*cell_size:(j+1)*cell_size
-            ]
-            # Majority vote on suitability class
-            aggregated[i, j] = np.median(window[window > 0]) if (window > 0).any() else 0
+    if NUMBA_AVAILABLE and suitability_map.dtype == np.uint8:
+        aggregated = _block_mode_kernel(suitability_map, cell_size, h_agg, w_agg)
+        logger.info(f"  Original: {h}×{w} → Aggregated: {h_agg}×{w_agg}")
+        return aggregated
+    
+    # View the cropped map as (h_agg, cell_size, w_agg, cell_size) blocks
+    blocks = suitability_map[:h_agg*cell_size, :w_agg*cell_size].reshape(
+        h_agg, cell_size, w_agg, cell_size
+    )
+    
+    # Majority vote on suitability class: keep a running best class and its
+    # vote count instead of materializing per-class counts for every block
+    aggregated = np.zeros((h_agg, w_agg), dtype=np.uint8)
+    best_count = np.zeros((h_agg, w_agg), dtype=np.intp)
+    for c in (1, 2, 3):
+        count = (blocks == c).sum(axis=(1, 3))
+        aggregated[count > best_count] = c
+        np.maximum(best_count, count, out=best_count)
     
     logger.info(f"  Original: {h}×{w} → Aggregated: {h_agg}×{w_agg}")
     
@@ -234,10 +388,10 @@ def save_processed_raster(
     profile: Dict
 ):
     """
-    Save processed raster to GeoTIFF.
+    Save processed raster to a tiled, deflate-compressed GeoTIFF.
     
     Args:
-        data: 2D or 3D array
+        data: 2D array (height, width) or 3D array (bands, height, width)
         output_path: Path to output file
         profile: rasterio profile from original GEE export
     """
@@ -245,14 +399,38 @@ def save_processed_raster(
     
     output_path.parent.mkdir(parents=True, exist_ok=True)
     
-    # Update profile for output
-    profile.update(count=data.shape[2] if len(data.shape) == 3 else 1)
+    # Update a copy of the profile so the caller's dict is left untouched
+    profile = dict(profile)
+    profile.update(count=data.shape[0] if len(data.shape) == 3 else 1)
+    
+    # Class rasters are written as uint8; 0 doubles as nodata when the
+    # source nodata value cannot be represented
+    if data.dtype == np.uint8:
+        profile["dtype"] = "uint8"
+        nodata = profile.get("nodata")
+        if nodata is not None and not (0 <= nodata <= 255 and float(nodata).is_integer()):
+            profile["nodata"] = 0
+    
+    # Tiled, deflate-compressed, band-interleaved output so later reads can
+    # go block by block and band by band; horizontal differencing suits
+    # class rasters, floating-point prediction suits continuous ones
+    profile.update(
+        tiled=True,
+        interleave="band",
+        blockxsize=256,
+        blockysize=256,
+        compress="deflate",
+        predictor=3 if np.issubdtype(np.dtype(profile["dtype"]), np.floating) else 2
+    )
+    
+    # Band-major data maps directly onto GeoTIFF bands
+    cube = data if len(data.shape) == 3 else data[np.newaxis]
     
     with rasterio.open(output_path, "w", **profile) as dst:
-        if len(data.shape) == 3:
-            for i in range(data.shape[2]):
-                dst.write(data[:, :, i].astype(profile["dtype"]), i + 1)
-        else:
-            dst.write(data.astype(profile["dtype"]), 1)
+        # Write one tile at a time so the dtype cast never copies the whole array
+        for _, window in dst.block_windows(1):
+            rows = slice(window.row_off, window.row_off + window.height)
+            cols = slice(window.col_off, window.col_off + window.width)
+            dst.write(cube[:, rows, cols].astype(profile["dtype"], copy=False), window=window)
     
     logger.info(f"✓ Saved: {output_path}")
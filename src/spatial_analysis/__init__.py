@@ -9,15 +9,19 @@ This module handles geospatial analysis of AWD suitability patterns:
 """
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 from scipy.ndimage import label, find_objects
 
 logger = logging.getLogger(__name__)
 
 
-def compute_fragmentation_index(suitability_map: np.ndarray) -> Dict[str, float]:
+def compute_fragmentation_index(
+    suitability_map: np.ndarray,
+    include_labels: bool = False
+) -> Dict[str, float]:
     """
     Quantify spatial fragmentation of suitable areas.
     
@@ -26,6 +30,8 @@ def compute_fragmentation_index(suitability_map: np.ndarray) -> Dict[str, float]
     
     Args:
         suitability_map: Binary array where 1 = suitable, 0 = unsuitable
+        include_labels: If True, also return the patch labeling so it can be
+            passed to identify_suitability_clusters without relabeling
     
     Returns:
         Dictionary with fragmentation metrics:
@@ -34,15 +40,21 @@ def compute_fragmentation_index(suitability_map: np.ndarray) -> Dict[str, float]
         - max_patch_size: Largest patch size (cells)
         - min_patch_size: Smallest patch size (cells)
         - fragmentation_index: Ratio of mean to max patch size (0-1, higher = more fragmented)
+        With include_labels, additionally:
+        - labeled: int32 label array (0 = background)
+        - sizes: Patch sizes (cells), indexed by label - 1
+        - bboxes: Bounding-box slices per patch from find_objects
     """
     logger.info("Computing fragmentation index")
     
-    # Label connected components (suitable patches)
-    labeled_array, n_patches = label(suitability_map)
+    # Label connected components (suitable patches) into an explicit int32
+    # buffer so the label array size does not depend on scipy defaults
+    labeled_array = np.empty(np.shape(suitability_map), dtype=np.int32)
+    n_patches = label(suitability_map, output=labeled_array)
     
     if n_patches == 0:
         logger.warning("No suitable patches found")
-        return {
+        results = {
             "n_patches": 0,
             "mean_patch_size": 0,
             "max_patch_size": 0,
@@ -50,9 +62,12 @@ def compute_fragmentation_index(suitability_map: np.ndarray) -> Dict[str, float]
             "fragmentation_index": 0,
             "total_suitable_cells": 0
         }
+        if include_labels:
+            results.update(labeled=labeled_array, sizes=np.zeros(0, dtype=np.intp), bboxes=[])
+        return results
     
     # Compute patch sizes
-    patch_sizes = np.bincount(labeled_array.ravel())[1:]  # Exclude background
+    patch_sizes = np.bincount(labeled_array.reshape(-1), minlength=n_patches + 1)[1:]  # Exclude background
     
     mean_size = patch_sizes.mean()
     max_size = patch_sizes.max()
@@ -72,6 +87,13 @@ def compute_fragmentation_index(suitability_map: np.ndarray) -> Dict[str, float]
         "total_suitable_cells": patch_sizes.sum()
     }
     
+    if include_labels:
+        results.update(
+            labeled=labeled_array,
+            sizes=patch_sizes,
+            bboxes=find_objects(labeled_array)
+        )
+    
     logger.info(f"Fragmentation results:")
     logger.info(f"  Patches: {n_patches}")
     logger.info(f"  Mean patch size: {mean_size:.0f} cells")
@@ -133,7 +155,7 @@ def compute_regional_statistics(
     
     Args:
         suitability_map: Binary map (1 = suitable, 0 = unsuitable)
-        region_map: Raster with region IDs
+        region_map: Raster with integer region IDs
         regions: Dictionary mapping region_id -> region_name
     
     Returns:
@@ -141,17 +163,44 @@ def compute_regional_statistics(
     """
     logger.info(f"Computing regional statistics for {len(regions)} regions")
     
+    flat_regions = np.asarray(region_map).ravel()
+    flat_suitable = np.ascontiguousarray(suitability_map > 0).view(np.uint8).ravel()
+    
+    # Sparse or negative IDs (e.g. administrative codes) and float rasters
+    # (which may carry NaN nodata) are factorized to 0..R-1 first, so the
+    # count arrays are bounded by the number of distinct IDs rather than the
+    # largest one; small dense integer IDs are used directly
+    if flat_regions.size and (
+        flat_regions.dtype.kind not in "biu"
+        or flat_regions.min() < 0
+        or flat_regions.max() >= 2 * len(regions)
+    ):
+        unique_ids, flat_bins = np.unique(flat_regions, return_inverse=True)
+    else:
+        unique_ids, flat_bins = None, flat_regions
+    
+    # Pixel and suitable-pixel counts for every region in one pass each,
+    # instead of one full-raster mask per region
+    totals = np.bincount(flat_bins)
+    suitables = np.bincount(flat_bins, weights=flat_suitable, minlength=totals.size).astype(np.int64)
+    
     results = []
     
     for region_id, region_name in regions.items():
-        mask = region_map == region_id
+        if unique_ids is not None:
+            bin_idx = np.searchsorted(unique_ids, region_id)
+            found = bin_idx < unique_ids.size and unique_ids[bin_idx] == region_id
+        else:
+            bin_idx = region_id
+            found = 0 <= bin_idx < totals.size
+        
+        n_pixels = totals[bin_idx] if found else 0
         
-        if not mask.any():
+        if n_pixels == 0:
             logger.warning(f"No data for region {region_name} (ID {region_id})")
             continue
         
-        n_pixels = mask.sum()
-        n_suitable = (suitability_map[mask] > 0).sum()
+        n_suitable = suitables[bin_idx]
         pct_suitable = 100 * n_suitable / n_pixels if n_pixels > 0 else 0
         
         results.append({
@@ -170,7 +219,8 @@ def compute_regional_statistics(
 
 def identify_suitability_clusters(
     suitability_map: np.ndarray,
-    min_cluster_size: int = 100
+    min_cluster_size: int = 100,
+    fragmentation: Optional[Dict] = None
 ) -> pd.DataFrame:
     """
     Identify and characterize distinct clusters of suitable areas.
@@ -180,27 +230,37 @@ def identify_suitability_clusters(
     Args:
         suitability_map: Binary map (1 = suitable, 0 = unsuitable)
         min_cluster_size: Minimum cluster size in pixels
+        fragmentation: Result of compute_fragmentation_index(..., include_labels=True)
+            for the same map; its labeling is reused instead of relabeling
     
     Returns:
         DataFrame with cluster statistics
     """
     logger.info(f"Identifying suitability clusters (min size: {min_cluster_size} pixels)")
     
-    labeled_array, n_clusters = label(suitability_map)
+    if fragmentation is not None and "labeled" in fragmentation:
+        n_clusters = fragmentation["n_patches"]
+        sizes = fragmentation["sizes"]
+        slices = fragmentation["bboxes"]
+    else:
+        labeled_array, n_clusters = label(suitability_map)
+        
+        # Sizes and bounding boxes of all clusters from one pass each
+        sizes = np.bincount(labeled_array.ravel(), minlength=n_clusters + 1)[1:]
+        slices = find_objects(labeled_array)
     
     results = []
     
     for cluster_id in range(1, n_clusters + 1):
-        cluster_mask = labeled_array == cluster_id
-        cluster_size = cluster_mask.sum()
+        bbox = slices[cluster_id - 1]
+        cluster_size = sizes[cluster_id - 1]
         
-        if cluster_size < min_cluster_size:
+        if bbox is None or cluster_size < min_cluster_size:
             continue
         
         # Get cluster bounds (rows, cols)
-        positions = np.where(cluster_mask)
-        min_row, max_row = positions[0].min(), positions[0].max()
-        min_col, max_col = positions[1].min(), positions[1].max()
+        min_row, max_row = bbox[0].start, bbox[0].stop - 1
+        min_col, max_col = bbox[1].start, bbox[1].stop - 1
         
         results.append({
             "cluster_id": cluster_id,
@@ -236,8 +296,13 @@ def compare_fragmentation(
     """
     logger.info("Comparing fragmentation between Vietnam and Japan")
     
-    vietnam_frag = compute_fragmentation_index(vietnam_map)
-    japan_frag = compute_fragmentation_index(japan_map)
+    # The two maps are independent, and label/bincount release the GIL,
+    # so both fragmentation analyses run concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        vietnam_future = executor.submit(compute_fragmentation_index, vietnam_map)
+        japan_future = executor.submit(compute_fragmentation_index, japan_map)
+        vietnam_frag = vietnam_future.result()
+        japan_frag = japan_future.result()
     
     comparison = {
         "vietnam_fragmentation_index": vietnam_frag["fragmentation_index"],
@@ -2,13 +2,54 @@
 Utility functions for geospatial data processing and validation.
 """
 
+import functools
 import numpy as np
 import logging
 from typing import Tuple, List, Dict
 
+try:
+    from numba import get_num_threads, njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba is optional; NumPy fallbacks are used instead
+    NUMBA_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _uint8_histogram_kernel(flat, n_chunks):
+        # Per-thread partial histograms avoid write races on the bins
+        n = flat.size
+        step = (n + n_chunks - 1) // n_chunks
+        partial = np.zeros((n_chunks, 256), np.int64)
+        for c in prange(n_chunks):
+            for i in range(c * step, min((c + 1) * step, n)):
+                partial[c, flat[i]] += 1
+        return partial.sum(axis=0)
+
+
+def uint8_histogram(values: np.ndarray) -> np.ndarray:
+    """
+    Count occurrences of each value in a uint8 array.
+    
+    Uses a parallel Numba kernel when numba is installed, np.bincount
+    otherwise.
+    
+    Args:
+        values: uint8 array of any shape
+        
+    Returns:
+        int64 array of 256 counts indexed by value
+    """
+    flat = np.ascontiguousarray(values, dtype=np.uint8).reshape(-1)
+    
+    if NUMBA_AVAILABLE:
+        return _uint8_histogram_kernel(flat, get_num_threads())
+    
+    return np.bincount(flat, minlength=256)
+
+
 def validate_bounding_box(bbox: List[float]) -> bool:
     """
     Validate bounding box format [min_lon, min_lat, max_lon, max_lat].
@@ -85,6 +126,28 @@ def classify_soil_texture(clay_pct: float, sand_pct: float) -> int:
         return 4  # Other
 
 
+def classify_soil_texture_vec(clay_pct: np.ndarray, sand_pct: np.ndarray) -> np.ndarray:
+    """
+    Array version of classify_soil_texture for whole rasters.
+    
+    Args:
+        clay_pct: Clay content as percentage
+        sand_pct: Sand content as percentage
+        
+    Returns:
+        uint8 array of soil texture classes (1-4)
+    """
+    clay = np.asarray(clay_pct)
+    sand = np.asarray(sand_pct)
+    
+    conditions = [
+        clay >= 45,                                 # Heavy clay
+        (clay >= 20) & (clay < 45) & (sand <= 52),  # Clay loam
+        (clay >= 20) & (clay < 35) & (sand > 52),   # Sandy clay loam
+    ]
+    return np.select(conditions, [1, 2, 3], default=4).astype(np.uint8)
+
+
 def compute_dekad_for_doy(day_of_year: int) -> int:
     """
     Convert day of year to dekad number (1-36).
@@ -132,6 +195,103 @@ def classify_awd_suitability(fraction_suitable: float,
         return 1  # Low
 
 
+def classify_awd_suitability_vec(fraction_suitable: np.ndarray,
+                                thresholds: Dict[str, float] = None) -> np.ndarray:
+    """
+    Array version of classify_awd_suitability for whole rasters.
+    
+    Args:
+        fraction_suitable: Fractions of season dekads with suitable water balance (0-1)
+        thresholds: Dict with 'high' and 'moderate' keys for custom thresholds
+        
+    Returns:
+        uint8 array of suitability classes (1, 2, or 3)
+    """
+    fraction = np.asarray(fraction_suitable)
+    
+    # Written as a negated in-range test so NaN is rejected like the scalar path
+    if (~((fraction >= 0) & (fraction <= 1))).any():
+        raise ValueError("Fractions must be between 0 and 1")
+    
+    if thresholds is None:
+        thresholds = {'high': 0.66, 'moderate': 0.33}
+    
+    # Bin 0 = below moderate, 1 = moderate, 2 = high (lower edges inclusive)
+    bins = [thresholds['moderate'], thresholds['high']]
+    return (np.digitize(fraction, bins) + 1).astype(np.uint8)
+
+
+_AWD_LUT_BINS = 1024
+
+
+@functools.lru_cache(maxsize=32)
+def _awd_suitability_lut(high: float, moderate: float) -> np.ndarray:
+    """
+    Suitability class per quantized fraction bin for one threshold pair.
+    
+    Bins that straddle a threshold (and their neighbours, to absorb rounding
+    in the quantization) are marked 0 so callers resolve them exactly.
+    
+    Args:
+        high: Lower edge of the high class
+        moderate: Lower edge of the moderate class
+        
+    Returns:
+        uint8 array of length _AWD_LUT_BINS with classes 1-3, or 0 if ambiguous
+    """
+    scale = _AWD_LUT_BINS - 1
+    edges = np.arange(_AWD_LUT_BINS + 1) / scale
+    edge_class = np.digitize(edges, [moderate, high]) + 1
+    
+    lut = edge_class[:-1].astype(np.uint8)
+    straddles = edge_class[:-1] != edge_class[1:]
+    straddles[1:] |= straddles[:-1].copy()
+    straddles[:-1] |= straddles[1:].copy()
+    lut[straddles] = 0
+    lut.flags.writeable = False
+    
+    return lut
+
+
+def classify_awd_suitability_lut(fraction_suitable: np.ndarray,
+                                 thresholds: Dict[str, float] = None) -> np.ndarray:
+    """
+    Lookup-table version of classify_awd_suitability for whole rasters.
+    
+    Fractions are quantized to 1024 bins and classified with one indexed
+    load per pixel, using a table memoized per threshold pair. The few
+    pixels in bins next to a threshold are classified exactly, so results
+    match classify_awd_suitability_vec. NaN and out-of-range fractions are
+    rejected, as in the scalar version.
+    
+    Args:
+        fraction_suitable: Fractions of season dekads with suitable water balance (0-1)
+        thresholds: Dict with 'high' and 'moderate' keys for custom thresholds
+        
+    Returns:
+        uint8 array of suitability classes (1, 2, or 3)
+    """
+    if thresholds is None:
+        thresholds = {'high': 0.66, 'moderate': 0.33}
+    
+    fraction = np.asarray(fraction_suitable, dtype=float)
+    flat = fraction.reshape(-1)
+    
+    # Validate before indexing: NaN would otherwise become a garbage index
+    if (~((flat >= 0) & (flat <= 1))).any():
+        raise ValueError("Fractions must be between 0 and 1")
+    
+    lut = _awd_suitability_lut(float(thresholds['high']), float(thresholds['moderate']))
+    
+    classes = lut[(flat * (_AWD_LUT_BINS - 1)).astype(np.intp)]
+    
+    ambiguous = classes == 0
+    if ambiguous.any():
+        classes[ambiguous] = classify_awd_suitability_vec(flat[ambiguous], thresholds)
+    
+    return classes.reshape(fraction.shape)
+
+
 def compute_fragmentation_index(patches: List[Tuple[float, float]]) -> float:
     """
     Compute fragmentation index as ratio of mean patch size to largest patch.
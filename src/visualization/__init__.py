@@ -9,7 +9,17 @@ This module generates publication-ready figures for analysis results:
 """
 
 import logging
+import os
+import sys
 import numpy as np
+import matplotlib
+
+# Figures are only ever written to disk, so default to the non-interactive
+# Agg backend unless the caller already chose one (pyplot imported, or
+# MPLBACKEND set, e.g. by a notebook kernel)
+if "matplotlib.pyplot" not in sys.modules and not os.environ.get("MPLBACKEND"):
+    matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 from pathlib import Path
@@ -18,11 +28,85 @@ from typing import Dict, Optional
 logger = logging.getLogger(__name__)
 
 
+def _save_figure(
+    fig: plt.Figure,
+    output_path: Path,
+    dpi: int,
+    format: Optional[str] = None
+) -> Path:
+    """
+    Save a figure, with a fixed zlib level for PNG output.
+    
+    Args:
+        fig: Figure to save
+        output_path: Path to output file
+        dpi: Figure resolution (ignored by vector formats)
+        format: Output format (e.g. 'png', 'svg', 'pdf'); replaces the
+            suffix of output_path when given
+    
+    Returns:
+        Path the figure was written to
+    """
+    if format:
+        output_path = output_path.with_suffix(f".{format}")
+    
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    save_kwargs = {}
+    if output_path.suffix.lower() == ".png":
+        # compress_level only; PIL's optimize flag overrides it with a slow search
+        save_kwargs["pil_kwargs"] = {"compress_level": 6}
+    
+    fig.savefig(output_path, dpi=dpi, bbox_inches='tight', **save_kwargs)
+    logger.info(f"✓ Saved: {output_path}")
+    
+    return output_path
+
+
+def _class_counts(suitability_array: np.ndarray) -> np.ndarray:
+    """
+    Count pixels of each suitability class (0-3) over the full array.
+    
+    Returns:
+        Array of 4 pixel counts indexed by class
+    """
+    flat = np.asarray(suitability_array).ravel()
+    
+    if np.issubdtype(flat.dtype, np.unsignedinteger):
+        return np.bincount(flat, minlength=4)[:4]
+    
+    return np.array([(flat == c).sum() for c in range(4)])
+
+
+def _display_array(array: np.ndarray, fig: plt.Figure, dpi: int) -> np.ndarray:
+    """
+    Decimate a raster so it has at most ~2× the pixels of the saved figure.
+    
+    imshow resamples to the output resolution anyway; feeding it the full
+    raster only inflates matplotlib's internal buffers.
+    
+    Args:
+        array: 2D raster to display
+        fig: Figure the raster is drawn into
+        dpi: Output resolution
+    
+    Returns:
+        Strided view of the array
+    """
+    target_h = int(fig.get_figheight() * dpi)
+    target_w = int(fig.get_figwidth() * dpi)
+    stride = max(1, array.shape[0] // (2 * target_h), array.shape[1] // (2 * target_w))
+    
+    return array[::stride, ::stride]
+
+
 def create_suitability_map(
     suitability_array: np.ndarray,
     title: str = "AWD Suitability",
     output_path: Optional[Path] = None,
-    dpi: int = 300
+    dpi: int = 300,
+    format: Optional[str] = None,
+    stats: Optional[Dict[str, float]] = None
 ) -> plt.Figure:
     """
     Create publication-ready suitability map visualization.
@@ -38,6 +122,11 @@ def create_suitability_map(
         title: Map title
         output_path: Path to save figure (optional)
         dpi: Figure resolution (default: 300 DPI for publication)
+        format: Output format overriding the suffix of output_path
+            (e.g. 'svg' or 'pdf' for vector output)
+        stats: Precomputed 'pct_high', 'pct_moderate' and 'pct_low' for the
+            caption (e.g. a row of compute_suitability_statistics); computed
+            from the array when omitted
     
     Returns:
         matplotlib Figure object
@@ -50,23 +139,28 @@ def create_suitability_map(
     cmap = plt.cm.colors.ListedColormap(['white', '#d7191c', '#fdae61', '#a6d96a'])
     
     # Plot with custom colormap
-    im = ax.imshow(suitability_array, cmap=cmap, vmin=0, vmax=3, interpolation='nearest')
+    disp = _display_array(suitability_array, fig, dpi)
+    im = ax.imshow(disp, cmap=cmap, vmin=0, vmax=3, interpolation='nearest')
     
     # Add colorbar with custom ticks
     cbar = fig.colorbar(im, ax=ax, ticks=[0.5, 1.5, 2.5, 3.5], pad=0.02)
     cbar.ax.set_yticklabels(['No Data', 'Low\n(<33%)', 'Moderate\n(33-66%)', 'High\n(≥66%)'])
     cbar.set_label('AWD Suitability Class', rotation=270, labelpad=20, fontsize=12)
     
-    # Compute statistics
-    valid_mask = suitability_array > 0
-    n_high = (suitability_array == 3).sum()
-    n_moderate = (suitability_array == 2).sum()
-    n_low = (suitability_array == 1).sum()
-    n_total = valid_mask.sum()
-    
-    pct_high = 100 * n_high / n_total if n_total > 0 else 0
-    pct_moderate = 100 * n_moderate / n_total if n_total > 0 else 0
-    pct_low = 100 * n_low / n_total if n_total > 0 else 0
+    # Compute statistics on the full-resolution array, not the display copy,
+    # unless the caller already has them
+    if stats is None:
+        counts = _class_counts(suitability_array)
+        n_low, n_moderate, n_high = counts[1], counts[2], counts[3]
+        n_total = n_low + n_moderate + n_high
+        
+        pct_high = 100 * n_high / n_total if n_total > 0 else 0
+        pct_moderate = 100 * n_moderate / n_total if n_total > 0 else 0
+        pct_low = 100 * n_low / n_total if n_total > 0 else 0
+    else:
+        pct_high = stats["pct_high"]
+        pct_moderate = stats["pct_moderate"]
+        pct_low = stats["pct_low"]
     
     # Add text box with statistics
     stats_text = f"High: {pct_high:.1f}% | Moderate: {pct_moderate:.1f}% | Low: {pct_low:.1f}%"
@@ -79,9 +173,7 @@ def create_suitability_map(
     plt.tight_layout()
     
     if output_path:
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        fig.savefig(output_path, dpi=dpi, bbox_inches='tight')
-        logger.info(f"✓ Saved: {output_path}")
+        _save_figure(fig, output_path, dpi, format)
     
     return fig
 
@@ -89,7 +181,8 @@ def create_suitability_map(
 def create_sensitivity_plot(
     sensitivity_df,
     output_path: Optional[Path] = None,
-    dpi: int = 300
+    dpi: int = 300,
+    format: Optional[str] = None
 ) -> plt.Figure:
     """
     Plot threshold sensitivity analysis results.
@@ -100,6 +193,8 @@ def create_sensitivity_plot(
         sensitivity_df: DataFrame with columns [threshold_mm, fraction_suitable, suitability_class]
         output_path: Path to save figure
         dpi: Figure resolution
+        format: Output format overriding the suffix of output_path
+            (e.g. 'svg' or 'pdf' for vector output)
     
     Returns:
         matplotlib Figure object
@@ -136,9 +231,7 @@ def create_sensitivity_plot(
     plt.tight_layout()
     
     if output_path:
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        fig.savefig(output_path, dpi=dpi, bbox_inches='tight')
-        logger.info(f"✓ Saved: {output_path}")
+        _save_figure(fig, output_path, dpi, format)
     
     return fig
 
@@ -147,7 +240,8 @@ def create_comparison_map(
     vietnam_array: np.ndarray,
     japan_array: np.ndarray,
     output_path: Optional[Path] = None,
-    dpi: int = 300
+    dpi: int = 300,
+    format: Optional[str] = None
 ) -> plt.Figure:
     """
     Create side-by-side comparison of Vietnam and Japan suitability.
@@ -159,6 +253,8 @@ def create_comparison_map(
         japan_array: Japan suitability map
         output_path: Path to save figure
         dpi: Figure resolution
+        format: Output format overriding the suffix of output_path
+            (e.g. 'svg' or 'pdf' for vector output)
     
     Returns:
         matplotlib Figure object
@@ -170,12 +266,12 @@ def create_comparison_map(
     cmap = plt.cm.colors.ListedColormap(['white', '#d7191c', '#fdae61', '#a6d96a'])
     
     # Vietnam map
-    im1 = ax1.imshow(vietnam_array, cmap=cmap, vmin=0, vmax=3, interpolation='nearest')
+    im1 = ax1.imshow(_display_array(vietnam_array, fig, dpi), cmap=cmap, vmin=0, vmax=3, interpolation='nearest')
     ax1.set_title('Vietnam: AWD Suitability', fontsize=14, fontweight='bold', pad=15)
     ax1.axis('off')
     
     # Japan map
-    im2 = ax2.imshow(japan_array, cmap=cmap, vmin=0, vmax=3, interpolation='nearest')
+    im2 = ax2.imshow(_display_array(japan_array, fig, dpi), cmap=cmap, vmin=0, vmax=3, interpolation='nearest')
     ax2.set_title('Japan: AWD Suitability', fontsize=14, fontweight='bold', pad=15)
     ax2.axis('off')
     
@@ -191,9 +287,7 @@ def create_comparison_map(
     plt.tight_layout(rect=[0, 0, 0.9, 0.96])
     
     if output_path:
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        fig.savefig(output_path, dpi=dpi, bbox_inches='tight')
-        logger.info(f"✓ Saved: {output_path}")
+        _save_figure(fig, output_path, dpi, format)
     
     return fig
 
@@ -202,7 +296,8 @@ def create_fragmentation_comparison(
     vietnam_stats: Dict,
     japan_stats: Dict,
     output_path: Optional[Path] = None,
-    dpi: int = 300
+    dpi: int = 300,
+    format: Optional[str] = None
 ) -> plt.Figure:
     """
     Visualize fragmentation comparison between Vietnam and Japan.
@@ -212,6 +307,8 @@ def create_fragmentation_comparison(
         japan_stats: Fragmentation dictionary from spatial_analysis module
         output_path: Path to save figure
         dpi: Figure resolution
+        format: Output format overriding the suffix of output_path
+            (e.g. 'svg' or 'pdf' for vector output)
     
     Returns:
         matplotlib Figure object
@@ -243,8 +340,6 @@ def create_fragmentation_comparison(
     plt.tight_layout()
     
     if output_path:
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        fig.savefig(output_path, dpi=dpi, bbox_inches='tight')
-        logger.info(f"✓ Saved: {output_path}")
+        _save_figure(fig, output_path, dpi, format)
     
     return fig
@@ -5,15 +5,99 @@ Computes dekad-level water balance from climate and soil data.
 Implements MapAWD algorithm for AWD suitability assessment.
 """
 
+import functools
 import numpy as np
 import pandas as pd
 import logging
-from typing import Dict, List, Tuple, Optional
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Tuple, Optional, Union
 from dataclasses import dataclass
 
+if TYPE_CHECKING:  # polars is only needed for the batch API
+    import polars as pl
+
+from src.utils import NUMBA_AVAILABLE
+
+if NUMBA_AVAILABLE:
+    from numba import njit, prange
+
 logger = logging.getLogger(__name__)
 
 
+if NUMBA_AVAILABLE:
+    # Compiled lazily on first call (then loaded from the on-disk cache), so
+    # importing the module never pays for JIT compilation; only multi-season
+    # series reach it (see _count_suitable)
+    @njit(cache=True)
+    def _count_suitable_kernel(wb, deficit_threshold_mm):
+        # Comparison and count fused into one branchless pass
+        count = 0
+        for i in range(wb.shape[0]):
+            x = wb[i]
+            count += (x < 0.0) & (x >= deficit_threshold_mm)
+        return count
+
+    @njit(parallel=True, cache=True)
+    def _awd_batch_kernel(rain, pet, perc, lo, hi, irrigation_mm, deficit_threshold_mm,
+                          high, moderate, out_frac, out_cls):
+        # Irrigation floor, water balance and suitability count fused into
+        # one pass over each pixel's active-season dekads
+        n_total = hi - lo
+        for p in prange(rain.shape[0]):
+            count = 0
+            for d in range(lo, hi):
+                wb = max(rain[p, d], irrigation_mm) - pet[p, d] - perc[p, d]
+                count += (wb < 0.0) & (wb >= deficit_threshold_mm)
+            frac = count / n_total
+            out_frac[p] = frac
+            out_cls[p] = 1 + (frac >= moderate) + (frac >= high)
+
+
+_DEKADS_PER_YEAR = 36
+
+
+def _count_suitable(wb: np.ndarray, deficit_threshold_mm: float) -> int:
+    """
+    Count dekads with a negative balance no worse than the deficit threshold.
+    
+    Args:
+        wb: 1D water balance values (mm)
+        deficit_threshold_mm: Maximum allowable deficit (mm, negative)
+        
+    Returns:
+        Number of suitable dekads
+    """
+    wb = np.asarray(wb)
+    
+    # A single season (at most 36 dekads) is counted with NumPy: a few
+    # microseconds, against a JIT compile or cache load of a few hundred
+    # milliseconds on the kernel's first call in each process
+    if NUMBA_AVAILABLE and wb.size > _DEKADS_PER_YEAR:
+        # One float64 specialization, however the caller typed the series
+        wb = wb.astype(np.float64, copy=False)
+        return int(_count_suitable_kernel(wb, float(deficit_threshold_mm)))
+    
+    return int(np.count_nonzero((wb < 0) & (wb >= deficit_threshold_mm)))
+
+
+def _build_dekad_of_doy() -> np.ndarray:
+    """
+    Dekad of year (0-35) for each 0-based day of a leap year.
+    
+    Standard calendar: days 1-10, 11-20 and 21-end of each month.
+    """
+    days = np.arange('2000-01-01', '2001-01-01', dtype='datetime64[D]')
+    months = days.astype('datetime64[M]')
+    month = months.astype(np.int64) % 12
+    day_in_month = (days - months).astype(np.int64)
+    return (month * 3 + np.minimum(day_in_month // 10, 2)).astype(np.int8)
+
+
+# Computed once at import; non-leap years are mapped onto it by skipping Feb 29
+_DEKAD_OF_DOY = _build_dekad_of_doy()
+_FEB_29_DOY = 59  # 0-based day of year of Feb 29 in a leap year
+
+
 @dataclass
 class WaterBalanceInputs:
     """Container for daily water balance inputs"""
@@ -28,33 +112,103 @@ def aggregate_rainfall_to_dekads(dates: np.ndarray,
     """
     Sum daily rainfall to dekad (10-day) totals.
     
+    Dekads follow the standard 36-per-year calendar: days 1-10, 11-20 and
+    21-end of each month. (Earlier versions put day 31 in a separate
+    fourth "dekad".) Missing rainfall values are treated as 0 and days
+    with a missing date (NaT) are dropped.
+    
     Args:
-        dates: Array of datetime objects (daily)
+        dates: Daily dates (datetime64 array, or anything pd.DatetimeIndex
+            accepts; tz-aware dates are grouped by their local date)
         rainfall_daily: Daily rainfall values (mm)
         
     Returns:
-        Tuple of (dekad_dates, dekad_rainfall_mm)
+        Tuple of (dekad_dates, dekad_rainfall_mm), in chronological order;
+        dekad_dates holds the first input date falling in each dekad
     """
-    df = pd.DataFrame({
-        'date': dates,
-        'rainfall': rainfall_daily
-    })
+    # Single conversion to day resolution (free if already datetime64[D]);
+    # everything below is integer arithmetic on this one array. Other input
+    # (lists, Timestamps, tz-aware Series) is normalized to naive local
+    # datetime64 first, so tz-aware dates keep their local calendar day.
+    if not (isinstance(dates, np.ndarray) and dates.dtype.kind == 'M'):
+        dates = pd.DatetimeIndex(dates).tz_localize(None).values
+    days = dates.astype('datetime64[D]', copy=False)
+    rainfall = np.asarray(rainfall_daily, dtype=np.float64)
+    
+    if days.shape != rainfall.shape:
+        raise ValueError(
+            f"dates and rainfall_daily must have the same length, "
+            f"got {days.shape} and {rainfall.shape}"
+        )
+    
+    # Days without a date (NaT) are dropped, as the old groupby did
+    valid = ~np.isnat(days)
+    if not valid.all():
+        dates, days, rainfall = dates[valid], days[valid], rainfall[valid]
+    
+    if days.size == 0:
+        return dates[:0], np.zeros(0)
+    
+    # Integer dekad index relative to the first year in the series, with the
+    # dekad of year gathered from the leap-year lookup table
+    years = days.astype('datetime64[Y]')
+    doy = (days - years).astype(np.int64)  # 0-based
+    year = years.astype(np.int64) + 1970
+    is_leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    doy += (doy >= _FEB_29_DOY) & ~is_leap
+    dekad_idx = (year - year.min()) * 36 + _DEKAD_OF_DOY[doy]
+    
+    if np.isnan(rainfall).any():
+        rainfall = np.where(np.isnan(rainfall), 0.0, rainfall)
+    
+    # Sorted daily series (the usual case): dekads are contiguous runs, so
+    # each run is summed in place with one reduceat call
+    steps = np.diff(dekad_idx)
+    if (steps >= 0).all():
+        boundaries = np.concatenate(([0], np.flatnonzero(steps) + 1))
+        return dates[boundaries], np.add.reduceat(rainfall, boundaries)
+    
+    # Unsorted input: sum rainfall per dekad
+    dekad_sums = np.bincount(dekad_idx, weights=rainfall)
+    
+    # First observation of each dekad; bins without observations are dropped
+    first_pos = np.full(dekad_sums.size, days.size, dtype=np.int64)
+    np.minimum.at(first_pos, dekad_idx, np.arange(days.size))
+    observed = first_pos < days.size
+    
+    dekad_dates = dates[first_pos[observed]]
+    dekad_rainfall = dekad_sums[observed]
+    
+    return dekad_dates, dekad_rainfall
+
+
+def aggregate_rainfall_to_dekads_df(daily: pd.DataFrame,
+                                     date_col: str = 'date',
+                                     rainfall_col: str = 'rainfall') -> pd.DataFrame:
+    """
+    DataFrame convenience wrapper around aggregate_rainfall_to_dekads.
     
-    # Group by dekad (every 10 days)
-    df['dekad'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m')
-    df['day_in_month'] = pd.to_datetime(df['date']).dt.day
-    df['dekad_id'] = ((df['day_in_month'] - 1) // 10) + 1
-    df['dekad_period'] = df['dekad'] + '-D' + df['dekad_id'].astype(str)
+    The aggregation itself runs on the underlying NumPy arrays; pandas is
+    only used to unpack the input and label the result.
     
-    # Sum rainfall per dekad
-    dekad_rainfall = df.groupby('dekad_period')['rainfall'].sum()
-    dekad_dates = df.groupby('dekad_period')['date'].first()
+    Args:
+        daily: DataFrame with one row per day
+        date_col: Name of the date column
+        rainfall_col: Name of the daily rainfall column (mm)
+        
+    Returns:
+        DataFrame with columns [date, rainfall_mm], one row per dekad
+    """
+    dekad_dates, dekad_rainfall = aggregate_rainfall_to_dekads(
+        daily[date_col].to_numpy(), daily[rainfall_col].to_numpy()
+    )
     
-    return dekad_dates.values, dekad_rainfall.values
+    return pd.DataFrame({'date': dekad_dates, 'rainfall_mm': dekad_rainfall})
 
 
 def apply_minimum_irrigation(rainfall_dekad: np.ndarray, 
-                             threshold_mm: float = 5.0) -> np.ndarray:
+                             threshold_mm: float = 5.0,
+                             out: Optional[np.ndarray] = None) -> np.ndarray:
     """
     Apply supplemental irrigation where dekad rainfall < threshold.
     
@@ -64,11 +218,13 @@ def apply_minimum_irrigation(rainfall_dekad: np.ndarray,
     Args:
         rainfall_dekad: Dekad rainfall totals (mm)
         threshold_mm: Minimum rainfall before irrigation applied (mm)
+        out: Optional output buffer; may be rainfall_dekad itself to
+            adjust in place without allocating
         
     Returns:
         Adjusted rainfall (original or threshold, whichever is higher)
     """
-    return np.maximum(rainfall_dekad, threshold_mm)
+    return np.maximum(rainfall_dekad, threshold_mm, out=out)
 
 
 def compute_water_balance_dekad(rainfall_mm: float,
@@ -94,6 +250,29 @@ def compute_water_balance_dekad(rainfall_mm: float,
     return water_balance
 
 
+def compute_water_balance_dekad_array(rainfall_mm: np.ndarray,
+                                      pet_mm: np.ndarray,
+                                      percolation_mm: np.ndarray,
+                                      out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Compute water balance for arrays of dekads.
+    
+    Array counterpart of compute_water_balance_dekad that writes into a
+    single buffer, e.g. the one filled by apply_minimum_irrigation.
+    
+    Args:
+        rainfall_mm: Dekad rainfall totals (mm)
+        pet_mm: Dekad potential evapotranspiration (mm)
+        percolation_mm: Dekad soil percolation (mm)
+        out: Optional output buffer; may be rainfall_mm itself
+        
+    Returns:
+        Water balance (mm) - negative indicates deficit
+    """
+    out = np.subtract(rainfall_mm, pet_mm, out=out)
+    return np.subtract(out, percolation_mm, out=out)
+
+
 def assess_awd_suitability_dekad(water_balance_mm: float,
                                  deficit_threshold_mm: float = -50.0) -> bool:
     """
@@ -110,8 +289,83 @@ def assess_awd_suitability_dekad(water_balance_mm: float,
     Returns:
         Boolean: True if dekad is suitable for AWD drying
     """
-    # Suitable if: negative (field dries) but not worse than threshold
-    return (water_balance_mm < 0) and (water_balance_mm >= deficit_threshold_mm)
+    # Suitable if: negative (field dries) but not worse than threshold;
+    # bitwise & evaluates both comparisons without a short-circuit branch
+    return (water_balance_mm < 0) & (water_balance_mm >= deficit_threshold_mm)
+
+
+def _active_season(water_balance_series: np.ndarray,
+                   season_start_dekad: int,
+                   season_end_dekad: int,
+                   exclude_first: int,
+                   exclude_last: int) -> Optional[np.ndarray]:
+    """
+    Slice the active season (excluding establishment and harvest phases).
+    
+    Returns:
+        Active-season water balance, or None if the window is too small
+    """
+    active_start = season_start_dekad + exclude_first
+    active_end = season_end_dekad - exclude_last
+    
+    if active_start >= active_end:
+        logger.warning("Active season window too small after exclusions")
+        return None
+    
+    return np.asarray(water_balance_series)[active_start:active_end+1]
+
+
+def quantize_water_balance(water_balance_mm: np.ndarray,
+                           scale_mm: float = 1.0,
+                           dtype: type = np.int16) -> np.ndarray:
+    """
+    Quantize water balance to small integers for large batch screening.
+    
+    int16 at 1 mm resolution covers ±32 m; int8 at 4 mm (scale_mm=4)
+    covers about ±500 mm, enough for dekad balances, at an eighth of the
+    float64 memory traffic. Values are rounded to the nearest step and
+    clipped to the dtype range; NaN maps to the dtype minimum, which
+    is never suitable (see assess_awd_suitability_quantized).
+    
+    Args:
+        water_balance_mm: Water balance values (mm)
+        scale_mm: Quantization step (mm per integer unit)
+        dtype: Signed integer dtype (np.int16 or np.int8)
+        
+    Returns:
+        Quantized water balance
+    """
+    info = np.iinfo(dtype)
+    scaled = np.rint(np.asarray(water_balance_mm, dtype=np.float64) / scale_mm)
+    np.clip(scaled, info.min + 1, info.max, out=scaled)
+    scaled[np.isnan(scaled)] = info.min
+    return scaled.astype(dtype)
+
+
+def assess_awd_suitability_quantized(water_balance_q: np.ndarray,
+                                     deficit_threshold_mm: float = -50.0,
+                                     scale_mm: float = 1.0) -> np.ndarray:
+    """
+    Vectorized AWD dekad suitability on quantized water balance.
+    
+    Same criteria as assess_awd_suitability_dekad, evaluated with integer
+    comparisons on the output of quantize_water_balance. Results can
+    differ from the float test for balances within half a step of 0 or
+    of the threshold.
+    
+    Args:
+        water_balance_q: Quantized water balance
+        deficit_threshold_mm: Maximum allowable deficit (mm, negative)
+        scale_mm: Quantization step used for water_balance_q
+        
+    Returns:
+        Boolean array: True where the dekad is suitable for AWD drying
+    """
+    info = np.iinfo(water_balance_q.dtype)
+    threshold_q = int(np.clip(np.rint(deficit_threshold_mm / scale_mm), info.min + 1, info.max))
+    threshold_q = water_balance_q.dtype.type(threshold_q)
+    
+    return (water_balance_q < 0) & (water_balance_q >= threshold_q)
 
 
 def compute_awd_suitability_index(water_balance_series: np.ndarray,
@@ -136,31 +390,136 @@ def compute_awd_suitability_index(water_balance_series: np.ndarray,
     Returns:
         Tuple of (fraction_suitable, num_suitable, num_total)
     """
-    # Define active season (excluding establishment and harvest phases)
-    active_start = season_start_dekad + exclude_first
-    active_end = season_end_dekad - exclude_last
+    series = np.ascontiguousarray(water_balance_series)
+    args = (season_start_dekad, season_end_dekad, exclude_first, exclude_last, deficit_threshold_mm)
     
-    if active_start >= active_end:
-        logger.warning("Active season window too small after exclusions")
-        return 0.0, 0, 0
+    # Small series (a few years of dekads) are memoized by content, so
+    # repeated sweeps over the same series are lookups; large ones bypass
+    # the cache rather than pinning their bytes in memory
+    if series.ndim == 1 and series.nbytes <= _INDEX_CACHE_MAX_BYTES:
+        return _suitability_index_cached(series.tobytes(), series.dtype.str, *args)
     
+    return _suitability_index(series, *args)
+
+
+_INDEX_CACHE_MAX_BYTES = 10 * 1024
+
+
+@functools.lru_cache(maxsize=1024)
+def _suitability_index_cached(series_bytes: bytes,
+                              dtype: str,
+                              *args) -> Tuple[float, int, int]:
+    """Memoized compute_awd_suitability_index keyed on the series content."""
+    return _suitability_index(np.frombuffer(series_bytes, dtype=dtype), *args)
+
+
+def _suitability_index(water_balance_series: np.ndarray,
+                       season_start_dekad: int,
+                       season_end_dekad: int,
+                       exclude_first: int,
+                       exclude_last: int,
+                       deficit_threshold_mm: float) -> Tuple[float, int, int]:
+    """Uncached body of compute_awd_suitability_index."""
     # Extract active season water balance
-    active_dekads = water_balance_series[active_start:active_end+1]
+    active_dekads = _active_season(
+        water_balance_series, season_start_dekad, season_end_dekad,
+        exclude_first, exclude_last
+    )
     
-    # Count suitable dekads
-    suitable = np.array([
-        assess_awd_suitability_dekad(wb, deficit_threshold_mm) 
-        for wb in active_dekads
-    ])
+    if active_dekads is None:
+        return 0.0, 0, 0
     
-    num_suitable = np.sum(suitable)
-    num_total = len(active_dekads)
+    # Count suitable dekads (same criteria as assess_awd_suitability_dekad,
+    # evaluated over the whole window in one pass)
+    num_suitable = _count_suitable(active_dekads, deficit_threshold_mm)
+    num_total = active_dekads.size
     
     fraction_suitable = num_suitable / num_total if num_total > 0 else 0.0
     
     return fraction_suitable, num_suitable, num_total
 
 
+def compute_awd_suitability_batch(rainfall_mm: np.ndarray,
+                                  pet_mm: np.ndarray,
+                                  percolation_mm: np.ndarray,
+                                  season_start_dekad: int,
+                                  season_end_dekad: int,
+                                  exclude_first: int = 2,
+                                  exclude_last: int = 1,
+                                  deficit_threshold_mm: float = -50.0,
+                                  irrigation_threshold_mm: float = 5.0,
+                                  high_threshold: float = 0.66,
+                                  moderate_threshold: float = 0.33) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute AWD suitability for many pixels at once.
+    
+    Equivalent to apply_minimum_irrigation, compute_water_balance_dekad,
+    compute_awd_suitability_index and classify_suitability_from_fraction
+    applied to every pixel, but fused into a single pass (a parallel Numba
+    kernel when available) instead of one array pass per step.
+    
+    Args:
+        rainfall_mm: Dekad rainfall totals, shape (n_pixels, n_dekads)
+        pet_mm: Dekad potential evapotranspiration, broadcastable to rainfall (mm)
+        percolation_mm: Dekad soil percolation, broadcastable to rainfall (mm)
+        season_start_dekad: Starting dekad of rice season (1-36)
+        season_end_dekad: Ending dekad of rice season (1-36)
+        exclude_first: Number of dekads to exclude after season start
+        exclude_last: Number of dekads to exclude before season end
+        deficit_threshold_mm: Maximum allowable water deficit (mm, negative)
+        irrigation_threshold_mm: Minimum rainfall before irrigation applied (mm)
+        high_threshold: Fraction for "high" classification
+        moderate_threshold: Fraction for "moderate" classification
+        
+    Returns:
+        Tuple of (fraction_suitable per pixel, uint8 suitability class per pixel)
+    """
+    rain = np.ascontiguousarray(rainfall_mm, dtype=np.float64)
+    if rain.ndim != 2:
+        raise ValueError(
+            f"rainfall_mm must have shape (n_pixels, n_dekads), got {rain.shape}"
+        )
+    # Broadcast PET and percolation (e.g. per-dekad 1-D series) to the
+    # rainfall grid so the kernel never reads past a smaller array
+    try:
+        pet = np.ascontiguousarray(
+            np.broadcast_to(np.asarray(pet_mm, dtype=np.float64), rain.shape))
+        perc = np.ascontiguousarray(
+            np.broadcast_to(np.asarray(percolation_mm, dtype=np.float64), rain.shape))
+    except ValueError as e:
+        raise ValueError(
+            f"pet_mm and percolation_mm must broadcast to rainfall shape {rain.shape}"
+        ) from e
+    n_pixels, n_dekads = rain.shape
+    
+    fraction = np.zeros(n_pixels)
+    classes = np.ones(n_pixels, dtype=np.uint8)
+    
+    # Same active window as compute_awd_suitability_index
+    active_start = season_start_dekad + exclude_first
+    active_end = season_end_dekad - exclude_last
+    lo, hi = active_start, min(active_end + 1, n_dekads)
+    
+    if active_start >= active_end or hi <= lo:
+        logger.warning("Active season window too small after exclusions")
+        return fraction, classes
+    
+    if NUMBA_AVAILABLE:
+        _awd_batch_kernel(
+            rain, pet, perc, lo, hi, float(irrigation_threshold_mm),
+            float(deficit_threshold_mm), float(high_threshold),
+            float(moderate_threshold), fraction, classes
+        )
+        return fraction, classes
+    
+    wb = apply_minimum_irrigation(rain[:, lo:hi], irrigation_threshold_mm)
+    wb = compute_water_balance_dekad_array(wb, pet[:, lo:hi], perc[:, lo:hi], out=wb)
+    fraction = ((wb < 0) & (wb >= deficit_threshold_mm)).mean(axis=1)
+    classes = classify_suitability_array(fraction, high_threshold, moderate_threshold).astype(np.uint8)
+    
+    return fraction, classes
+
+
 def classify_suitability_from_fraction(fraction_suitable: float,
                                        high_threshold: float = 0.66,
                                        moderate_threshold: float = 0.33) -> int:
@@ -180,12 +539,36 @@ def classify_suitability_from_fraction(fraction_suitable: float,
     Returns:
         Suitability class (1, 2, or 3)
     """
-    if fraction_suitable >= high_threshold:
-        return 3
-    elif fraction_suitable >= moderate_threshold:
-        return 2
-    else:
-        return 1
+    # Branchless: each threshold reached adds one class
+    return int(1 + (fraction_suitable >= moderate_threshold) + (fraction_suitable >= high_threshold))
+
+
+def classify_suitability_array(fractions: np.ndarray,
+                               high_threshold: float = 0.66,
+                               moderate_threshold: float = 0.33) -> np.ndarray:
+    """
+    Classify AWD suitability for an array of suitable-dekad fractions.
+    
+    Array counterpart of classify_suitability_from_fraction (same classes
+    and inclusive lower edges; NaN fractions are class 1, as in the scalar
+    version).
+    
+    Args:
+        fractions: Fractions of suitable dekads (0-1)
+        high_threshold: Fraction for "high" classification
+        moderate_threshold: Fraction for "moderate" classification
+        
+    Returns:
+        Array of suitability classes (1, 2, or 3)
+    """
+    fractions = np.asarray(fractions)
+    classes = np.digitize(fractions, [moderate_threshold, high_threshold]) + 1
+    
+    # np.digitize sorts NaN above every edge; the scalar comparisons fail instead
+    return np.where(np.isnan(fractions), 1, classes)
+
+
+_BROADCAST_SWEEP_MAX = 64 * 1024  # K x N elements before switching to searchsorted
 
 
 def analyze_threshold_sensitivity(water_balance_series: np.ndarray,
@@ -202,30 +585,102 @@ def analyze_threshold_sensitivity(water_balance_series: np.ndarray,
         thresholds: List of deficit thresholds to test (mm, negative values)
         
     Returns:
-        DataFrame with columns: [threshold, fraction_suitable, suitability_class, num_suitable, num_total]
+        DataFrame with columns: [threshold_mm, fraction_suitable, suitability_class,
+        num_suitable_dekads, num_total_dekads, percentage_suitable], built
+        directly from per-column arrays
     """
-    results = []
+    thresholds_mm = np.asarray(thresholds, dtype=np.float64)
     
-    for threshold in thresholds:
-        fraction, num_suitable, num_total = compute_awd_suitability_index(
-            water_balance_series,
-            season_start_dekad,
-            season_end_dekad,
-            deficit_threshold_mm=threshold
-        )
-        
-        suitability_class = classify_suitability_from_fraction(fraction)
+    # Slice the season once, then count suitable dekads for all thresholds
+    active_dekads = _active_season(
+        water_balance_series, season_start_dekad, season_end_dekad,
+        exclude_first=2, exclude_last=1
+    )
+    
+    if active_dekads is None:
+        num_total = 0
+        num_suitable = np.zeros(thresholds_mm.size, dtype=np.int64)
+    elif thresholds_mm.size * active_dekads.size <= _BROADCAST_SWEEP_MAX:
+        # Typical sweep (a few thresholds x one season): a single K x N
+        # broadcast comparison
+        num_total = active_dekads.size
+        suitable = (active_dekads < 0) & (active_dekads >= thresholds_mm[:, None])
+        num_suitable = suitable.sum(axis=1)
+    else:
+        # Large sweeps: sort the deficits once; for each threshold the
+        # suitable dekads are the deficits at or above it (one binary search)
+        num_total = active_dekads.size
+        deficits = np.sort(active_dekads[active_dekads < 0])
+        num_suitable = deficits.size - np.searchsorted(deficits, thresholds_mm, side='left')
+    
+    fraction = num_suitable / num_total if num_total > 0 else np.zeros(thresholds_mm.size)
+    
+    return pd.DataFrame({
+        'threshold_mm': np.asarray(thresholds),
+        'fraction_suitable': fraction,
+        'suitability_class': classify_suitability_array(fraction),
+        'num_suitable_dekads': num_suitable,
+        'num_total_dekads': num_total,
+        'percentage_suitable': fraction * 100
+    })
+
+
+def assess_awd_batch(source: Union["pl.LazyFrame", str, Path],
+                     deficit_threshold_mm: float = -50.0,
+                     streaming: bool = True) -> "pl.DataFrame":
+    """
+    Assess AWD suitability for many pixels/sites in one Polars query.
+    
+    Daily inputs are summed to dekads per pixel, turned into water balance
+    and tested against the deficit threshold, all inside a single lazy
+    query plan that Polars parallelizes across cores (and can stream).
+    Callers restrict the input to the active season beforehand.
+    
+    Args:
+        source: LazyFrame, or path to a Parquet file/glob, with daily rows
+            and columns 'pixel', 'date', 'rain', 'pet', 'perc' (mm/day)
+        deficit_threshold_mm: Maximum allowable water deficit (mm, negative)
+        streaming: Collect with the streaming engine to bound memory
         
-        results.append({
-            'threshold_mm': threshold,
-            'fraction_suitable': fraction,
-            'suitability_class': suitability_class,
-            'num_suitable_dekads': num_suitable,
-            'num_total_dekads': num_total,
-            'percentage_suitable': fraction * 100
-        })
-    
-    return pd.DataFrame(results)
+    Returns:
+        Polars DataFrame with one row per pixel:
+        [pixel, fraction_suitable, num_suitable, num_total]
+    """
+    try:
+        import polars as pl
+    except ImportError as e:
+        raise ImportError("assess_awd_batch requires polars (pip install polars)") from e
+    
+    lf = pl.scan_parquet(source) if isinstance(source, (str, Path)) else source
+    
+    # Standard 36-dekad calendar: days 1-10, 11-20, 21-end of month. Date
+    # parts are cast to Int32 since their dtype varies across Polars versions
+    # (UInt32 in 0.19, Int8 later)
+    day = pl.col("date").dt.day().cast(pl.Int32)
+    month = pl.col("date").dt.month().cast(pl.Int32)
+    dekad_of_month = pl.when(day > 20).then(2).otherwise((day - 1) // 10)
+    dekad_id = pl.col("date").dt.year().cast(pl.Int32) * 36 + (month - 1) * 3 + dekad_of_month
+    
+    water_balance = pl.col("rain") - (pl.col("pet") + pl.col("perc"))
+    
+    query = (
+        lf.with_columns(dekad_id.alias("dekad_id"))
+        .group_by(["pixel", "dekad_id"])
+        .agg(pl.col("rain").sum(), pl.col("pet").sum(), pl.col("perc").sum())
+        .with_columns(water_balance.alias("wb"))
+        .with_columns(
+            ((pl.col("wb") < 0) & (pl.col("wb") >= deficit_threshold_mm)).alias("suitable")
+        )
+        .group_by("pixel")
+        .agg(
+            pl.col("suitable").cast(pl.Float64).mean().alias("fraction_suitable"),
+            pl.col("suitable").sum().cast(pl.Int64).alias("num_suitable"),
+            pl.col("suitable").count().cast(pl.Int64).alias("num_total"),
+        )
+        .sort("pixel")
+    )
+    
+    return query.collect(streaming=streaming)
 
 
 logger.info("Water balance module loaded")